@@ -1,21 +1,66 @@
 #!/usr/bin/env python3
 import os
 import sys
+import random
+import argparse
+import copy
+import errno
 import json
 import logging
 import shutil
+import signal
+import subprocess
+import tempfile
 import time
 import threading
 import http.server
-import socketserver
+import importlib
 import socket
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from functools import partial
 
+try:
+    import requests
+except ImportError:
+    requests = None  # Installed on demand by check_dependencies()
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# orjson parses in C when available; both raise a json.JSONDecodeError subclass
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
 # Constants
 CONFIG_FILE = 'deploy_config.json'
 BACKUP_DIR = 'deploy_backups'
 WWW_DIR = 'www'
+DEFAULT_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+
+# Linux ioctl that makes dst share src's extents (copy-on-write clone)
+FICLONE = 0x40049409
+
+# Cleared after the first "not supported" answer so later copies go straight to copy2
+_REFLINK_SUPPORTED = fcntl is not None and sys.platform.startswith('linux')
+_REFLINK_UNSUPPORTED_ERRNOS = frozenset(
+    getattr(errno, name) for name in ('EOPNOTSUPP', 'ENOTSUP', 'EINVAL', 'ENOTTY') if hasattr(errno, name))
+
+# Files to exclude from deployment (root_dir and BACKUP_DIR are added per deploy)
+_EXCLUDES = frozenset(os.path.normcase(name) for name in (
+    '.git', '.vscode', '__pycache__', 'deploy.log', 'deploy.py', 'deploy_config.json',
+    'deploy_to_github.ps1', 'mirror_script.py', 'summon_demon.ps1'))
+
+# Parsed configs keyed by (path, mtime_ns, size)
+_CONFIG_CACHE = {}
+
+# Shared requests.Session for health checks, created lazily
+_HEALTH_SESSION = None
 
 # Configure Logging
 logging.basicConfig(
@@ -43,26 +88,37 @@ class SecureHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     def log_message(self, format, *args):
         logger.info(f"Request: {self.address_string()} - {format%args}")
 
-def load_config():
-    """Load configuration from JSON file."""
+def load_config(path=CONFIG_FILE):
+    """
+    Load configuration from JSON file, reusing the parsed result while the file is unchanged.
+    The returned dict is shared between calls; copy it before modifying.
+    """
     try:
-        with open(CONFIG_FILE, 'r') as f:
-            return json.load(f)
+        st = os.stat(path)
+        key = (path, st.st_mtime_ns, st.st_size)
+        config = _CONFIG_CACHE.get(key)
+        if config is None:
+            with open(path, 'rb') as f:
+                config = _loads(f.read())
+            _CONFIG_CACHE[key] = config
+        return config
     except FileNotFoundError:
-        logger.error(f"Configuration file {CONFIG_FILE} not found.")
+        logger.error(f"Configuration file {path} not found.")
         sys.exit(1)
     except json.JSONDecodeError:
-        logger.error(f"Invalid JSON in {CONFIG_FILE}.")
+        logger.error(f"Invalid JSON in {path}.")
         sys.exit(1)
 
 def check_dependencies():
     """Check if necessary dependencies are installed."""
+    # requests was already imported at module load; pip only runs if that failed
+    global requests
     logger.info("Checking dependencies...")
-    try:
-        import requests
-    except ImportError:
+    if requests is None:
         logger.warning("'requests' module not found. Installing...")
         os.system(f"{sys.executable} -m pip install requests")
+        importlib.invalidate_caches()
+        import requests
 
 def setup_environment(config):
     """Setup directories and environment."""
@@ -78,53 +134,138 @@ def setup_environment(config):
     if not os.path.exists(BACKUP_DIR):
         os.makedirs(BACKUP_DIR)
 
+def _reflink_copy(src, dst, *, follow_symlinks=True):
+    """copy2() replacement that clones file data on reflink-capable filesystems (Btrfs, XFS)."""
+    global _REFLINK_SUPPORTED
+    if not _REFLINK_SUPPORTED:
+        return shutil.copy2(src, dst, follow_symlinks=follow_symlinks)
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    except OSError as e:
+        # ext4/tmpfs etc. will never clone, so stop trying; EXDEV only affects this pair
+        if e.errno in _REFLINK_UNSUPPORTED_ERRNOS:
+            _REFLINK_SUPPORTED = False
+        return shutil.copy2(src, dst, follow_symlinks=follow_symlinks)
+    shutil.copystat(src, dst, follow_symlinks=follow_symlinks)
+    return dst
+
+def _rsync(src, dst, extra=()):
+    """Mirror src into dst with rsync, transferring only changed files."""
+    subprocess.run(
+        ["rsync", "-a", "--delete", *extra, src.rstrip('/') + "/", dst.rstrip('/') + "/"],
+        check=True
+    )
+
+def _latest_backup():
+    """Return the most recent backup directory, or None if there is none."""
+    if not os.path.isdir(BACKUP_DIR):
+        return None
+    backups = sorted(d for d in os.listdir(BACKUP_DIR)
+                     if d.startswith('backup_') and os.path.isdir(os.path.join(BACKUP_DIR, d)))
+    return os.path.join(BACKUP_DIR, backups[-1]) if backups else None
+
 def backup_current_version(config):
     """Create a backup of the current WWW directory."""
     root_dir = config['server']['root_dir']
     if os.path.exists(root_dir) and os.listdir(root_dir):
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         backup_path = os.path.join(BACKUP_DIR, f"backup_{timestamp}")
-        shutil.copytree(root_dir, backup_path)
+        if shutil.which("rsync") is not None:
+            # Hardlink files unchanged since the previous backup instead of copying them
+            previous = _latest_backup()
+            extra = (f"--link-dest={os.path.abspath(previous)}",) if previous else ()
+            _rsync(root_dir, backup_path, extra)
+        else:
+            shutil.copytree(root_dir, backup_path, copy_function=_reflink_copy)
         logger.info(f"Backup created at: {backup_path}")
         return backup_path
     return None
 
+def _deploy_one(entry, root_dir):
+    """Copy a single top-level os.DirEntry into the WWW directory."""
+    src = entry.name
+    dst = os.path.join(root_dir, entry.name)
+    
+    # DirEntry caches the file type from the directory read, so no extra stat
+    if entry.is_dir():
+        if os.path.exists(dst):
+            shutil.rmtree(dst)
+        shutil.copytree(src, dst, copy_function=_reflink_copy)
+    else:
+        _reflink_copy(src, dst)
+
 def deploy_files(config):
     """Copy files from current directory to WWW directory (Simulation of build/deploy)."""
     root_dir = config['server']['root_dir']
     
-    # Files to exclude from deployment
-    excludes = [root_dir, BACKUP_DIR, '.git', '.vscode', '__pycache__', 'deploy.log', 'deploy.py', 'deploy_config.json', 'deploy_to_github.ps1', 'mirror_script.py', 'summon_demon.ps1']
+    # Normalized so './www' matches the 'www' entry it names
+    excludes = _EXCLUDES | {os.path.normcase(os.path.normpath(p)) for p in (root_dir, BACKUP_DIR)}
     
     logger.info("Deploying files...")
     
-    # Clean target directory (except for itself obviously)
-    # Actually, for idempotent operations, we might want to sync. 
-    # For simplicity, we copy everything not in excludes.
+    if shutil.which("rsync") is not None:
+        # Incremental sync: only changed files are transferred, stale ones are removed
+        with tempfile.NamedTemporaryFile('w', suffix='.exclude', delete=False) as f:
+            f.write('/.*\n')
+            for item in excludes:
+                f.write(f"/{item}\n")
+            exclude_file = f.name
+        try:
+            _rsync('.', root_dir, (f"--exclude-from={exclude_file}",))
+        finally:
+            os.remove(exclude_file)
+        logger.info(f"Synced files to {root_dir}")
+        return
     
-    count = 0
-    for item in os.listdir('.'):
-        if item in excludes or item.startswith('.'):
-            continue
-        
-        src = item
-        dst = os.path.join(root_dir, item)
-        
-        if os.path.isdir(src):
-            if os.path.exists(dst):
-                shutil.rmtree(dst)
-            shutil.copytree(src, dst)
-        else:
-            shutil.copy2(src, dst)
-        count += 1
+    # Fallback when rsync is unavailable: copy everything not in excludes.
+    with os.scandir('.') as it:
+        worklist = [entry for entry in it
+                    if not (entry.name[0] == '.' or os.path.normcase(entry.name) in excludes)]
+    
+    workers = config.get('deploy', {}).get('workers', DEFAULT_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_deploy_one, entry, root_dir) for entry in worklist]
+        # Surface the first failure so main() can roll back
+        for future in as_completed(futures):
+            future.result()
     
-    logger.info(f"Deployed {count} items to {root_dir}")
+    logger.info(f"Deployed {len(worklist)} items to {root_dir}")
+
+def _get_health_session():
+    """Return the shared health check session, creating it on first use."""
+    global _HEALTH_SESSION
+    if _HEALTH_SESSION is None:
+        session = requests.Session()
+        # One keep-alive connection to the local server, reused across retries
+        session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        _HEALTH_SESSION = session
+    return _HEALTH_SESSION
+
+def close_health_session():
+    """Close the shared health check session, if one was opened."""
+    global _HEALTH_SESSION
+    if _HEALTH_SESSION is not None:
+        _HEALTH_SESSION.close()
+        _HEALTH_SESSION = None
+
+class _Breaker:
+    """Trips after a run of consecutive connection failures."""
+    def __init__(self, fail_thresh=3):
+        self.fail_thresh = fail_thresh
+        self.fails = 0
+
+    def record(self, connection_failed):
+        self.fails = self.fails + 1 if connection_failed else 0
+
+    @property
+    def tripped(self):
+        return self.fails >= self.fail_thresh
 
 def health_check(config):
     """Perform health check on the running server."""
-    import requests
-    import time
-    
     host = config['server']['host']
     port = config['server']['port']
     endpoint = config['health_check']['endpoint']
@@ -133,9 +274,16 @@ def health_check(config):
     logger.info(f"Running health check on {url}...")
     
     retries = config['health_check']['retries']
+    backoff_base = config['health_check'].get('backoff_base', 0.25)
+    backoff_cap = config['health_check'].get('backoff_cap', 30)
+    jitter = config['health_check'].get('jitter', True)
+    # Default below retries so an early exit can actually save attempts
+    breaker = _Breaker(config['health_check'].get('breaker_threshold', max(1, min(3, retries - 1))))
+    session = _get_health_session()
     for i in range(retries):
         try:
-            response = requests.get(url, timeout=config['health_check']['timeout'])
+            response = session.get(url, timeout=config['health_check']['timeout'])
+            breaker.record(False)
             if response.status_code == 200:
                 logger.info("Health check PASSED.")
                 return True
@@ -143,8 +291,18 @@ def health_check(config):
                 logger.warning(f"Health check returned status code: {response.status_code}")
         except Exception as e:
             logger.warning(f"Health check attempt {i+1} failed: {e}")
+            # Refused connections mean nothing is listening; timeouts may just be a slow start
+            breaker.record(isinstance(e, requests.exceptions.ConnectionError)
+                           and not isinstance(e, requests.exceptions.Timeout))
+        
+        if breaker.tripped:
+            logger.error(f"Health check aborted after {breaker.fails} consecutive connection failures.")
+            return False
         
-        time.sleep(1)
+        if i < retries - 1:
+            # Exponential backoff; full jitter keeps concurrent deploys from probing in lockstep
+            delay = min(backoff_cap, backoff_base * (2 ** i))
+            time.sleep(random.uniform(0, delay) if jitter else delay)
     
     logger.error("Health check FAILED.")
     return False
@@ -164,7 +322,8 @@ def start_server(config):
                 logger.error(f"Port {port} is already in use.")
                 return None
 
-        httpd = socketserver.TCPServer((host, port), handler)
+        # Handles each request on its own daemon thread so slow clients don't block others
+        httpd = http.server.ThreadingHTTPServer((host, port), handler)
         logger.info(f"Serving HTTP on {host} port {port} (http://{host}:{port}/) ...")
         
         server_thread = threading.Thread(target=httpd.serve_forever)
@@ -188,16 +347,40 @@ def rollback(backup_path, config):
     try:
         if os.path.exists(root_dir):
             shutil.rmtree(root_dir)
-        shutil.copytree(backup_path, root_dir)
+        shutil.copytree(backup_path, root_dir, copy_function=_reflink_copy)
         logger.info("Rollback successful.")
     except Exception as e:
         logger.critical(f"Rollback failed: {e}")
 
+def _positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Deploy and serve the site.")
+    parser.add_argument('--workers', type=_positive_int, default=None,
+                        help=f"Parallel copy workers when rsync is unavailable (default: {DEFAULT_WORKERS})")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     logger.info("Starting deployment process...")
     
     # 1. Load Config
-    config = load_config()
+    config = copy.deepcopy(load_config())
+    if args.workers is not None:
+        config.setdefault('deploy', {})['workers'] = args.workers
+    workers = config.get('deploy', {}).get('workers', DEFAULT_WORKERS)
+    if isinstance(workers, bool) or not isinstance(workers, int) or workers < 1:
+        # Reject before anything is touched, so a typo can't trigger a rollback
+        logger.error(f"deploy.workers must be a positive integer, got {workers!r}.")
+        sys.exit(1)
     
     # 2. Check Dependencies
     check_dependencies()
@@ -225,7 +408,9 @@ def main():
         sys.exit(1)
     
     # 7. Health Check
-    if not health_check(config):
+    healthy = health_check(config)
+    close_health_session()
+    if not healthy:
         logger.error("Deployment verification failed.")
         server.shutdown()
         if backup_path:
@@ -234,14 +419,15 @@ def main():
     
     logger.info("Deployment SUCCESSFUL. System is online.")
     
-    # Keep main thread alive
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        logger.info("Stopping server...")
-        server.shutdown()
-        sys.exit(0)
+    # Park the main thread until SIGINT/SIGTERM instead of polling
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    stop.wait()
+    
+    logger.info("Stopping server...")
+    server.shutdown()
+    sys.exit(0)
 
 if __name__ == '__main__':
     main()
@@ -1,21 +1,110 @@
+import argparse
+import codecs
+import html
+import mmap
 import os
-import sys
+import re
 import urllib.parse
-from bs4 import BeautifulSoup
-import chardet
+from concurrent.futures import ProcessPoolExecutor
 
 # Configuration
 ROOT_DIR = os.getcwd()
 EXTENSIONS_TO_CHECK = ['.html', '.htm', '.js', '.css']
 DRY_RUN = True  # Default to dry run for safety
+HTML_EXTENSIONS = ('.html', '.htm')
+ENCODING_SAMPLE_SIZE = 64 * 1024
+SKIP_DIRS = ('.git', 'deploy_backups')
+EXTERNAL_PREFIXES = ('http:', 'https:', 'mailto:', 'tel:', '#', 'javascript:', 'data:')
+
+# Set in each worker process by _init_worker()
+_WORKER_STATE = {}
+
+# Prefer the C-based lxml parser when it is installed
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# Elements to check and the attribute holding their URL
+TAG_ATTR = {
+    'a': 'href',
+    'link': 'href',
+    'script': 'src',
+    'img': 'src',
+    'source': 'src',
+    'iframe': 'src',
+    'meta': 'content' # Sometimes used for redirects or images
+}
+LINK_SELECTOR = 'a[href], link[href], script[src], img[src], source[src], iframe[src], meta[property]'
+
+# URL references inside stylesheets and scripts
+CSS_URL_RE = re.compile(r'''url\(\s*["']?([^"')]+)''')
+JS_PATH_RE = re.compile(r'''["'](/[^"'\s]+\.(?:js|css|png|jpg|svg|webp))["']''')
+
+# A start tag; quoted values are consumed whole, so a '>' inside them doesn't end it
+START_TAG_RE = re.compile(r'''<[^\s/>]+((?:"[^"]*"|'[^']*'|[^'">])*)>''')
+# One name[=value] attribute inside a start tag; the value is quoted or bare
+TAG_ATTR_RE = re.compile(r'''([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+)))?''')
+
+# Declared encoding, e.g. <meta charset="utf-8"> or content="text/html; charset=utf-8"
+CHARSET_RE = re.compile(rb'''charset\s*=\s*["']?([\w\-]+)''', re.IGNORECASE)
+
+def build_index(root):
+    """
+    Walks root once so link checks become lookups instead of stat calls.
+    Symlinked directories are not followed; lookups that miss are confirmed
+    on disk by check_and_fix_file().
+    Returns:
+        existing: set of normalized absolute paths of every file
+        dirmap: {normalized_dir_path: {lowercase_name: actual_name}}
+        file_list: paths of the files to scan
+    """
+    existing = set()
+    dirmap = {}
+    file_list = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirpath = os.path.normpath(dirpath)
+        dirmap[dirpath] = {f.lower(): f for f in dirnames + filenames}
+        for file in filenames:
+            file_path = os.path.join(dirpath, file)
+            existing.add(file_path)
+            # Skip the mirror script itself and report logs
+            if file.endswith(tuple(EXTENSIONS_TO_CHECK)) and file not in ['fix_404s.py', 'mirror_log.txt']:
+                file_list.append(file_path)
+        # Skip hidden repository data and backups (a full site copy per deploy)
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+    return existing, dirmap, file_list
+
+def _detect_encoding(raw):
+    """Cheap encoding detection: BOM, declared charset, UTF-8, then statistical guess."""
+    if raw.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if raw.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+
+    match = CHARSET_RE.search(raw[:1024])
+    if match:
+        declared = match.group(1).decode('ascii')
+        try:
+            codecs.lookup(declared)
+            return declared
+        except LookupError:
+            pass
+
+    try:
+        # Incremental decode tolerates a multi-byte character cut off at the end of a sample
+        codecs.getincrementaldecoder('utf-8')().decode(raw)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
 
-def get_files_in_directory(directory):
-    """Returns a dictionary of {lowercase_name: actual_name} for a directory."""
     try:
-        files = os.listdir(directory)
-        return {f.lower(): f for f in files}
-    except OSError:
-        return {}
+        from charset_normalizer import from_bytes
+    except ImportError:
+        return 'utf-8'
+    best = from_bytes(raw).best()
+    return best.encoding if best is not None else 'utf-8'
 
 def resolve_path(file_path, link_url):
     """
@@ -25,14 +114,15 @@ def resolve_path(file_path, link_url):
         is_absolute_url (bool)
     """
     # Ignore external links, anchors, mailto, etc.
-    if link_url.startswith(('http:', 'https:', 'mailto:', 'tel:', '#', 'javascript:', 'data:')):
+    if link_url.startswith(EXTERNAL_PREFIXES):
         return None, False
 
-    # Decode URL (e.g. %20 -> space)
-    link_url = urllib.parse.unquote(link_url)
+    # Decode URL (e.g. %20 -> space); most links have no escapes at all
+    if '%' in link_url:
+        link_url = urllib.parse.unquote(link_url)
     
     # Strip query params and fragments
-    link_url = link_url.split('?')[0].split('#')[0]
+    link_url = link_url.partition('?')[0].partition('#')[0]
 
     if not link_url:
         return None, False
@@ -48,122 +138,230 @@ def resolve_path(file_path, link_url):
         abs_path = os.path.join(dir_name, link_url)
         return abs_path, False
 
-def check_and_fix_file(file_path, dry_run=True):
-    """Checks links in a file and proposes/applies fixes."""
+def check_and_fix_file(file_path, existing, dirmap, dry_run=True):
+    """
+    Checks links in a file and proposes fixes. Safe to run in a worker
+    process: nothing is printed or written here.
+    Returns:
+        (file_path, issues_found, messages, new_content, encoding)
+        new_content is None unless fixes should be written back.
+    """
+    messages = []
     try:
-        # Detect encoding
+        # Map the file once; detect the encoding from its head, then decode it all
         with open(file_path, 'rb') as f:
-            raw = f.read()
-            encoding = chardet.detect(raw)['encoding'] or 'utf-8'
-        
-        with open(file_path, 'r', encoding=encoding, errors='ignore') as f:
-            content = f.read()
+            if os.fstat(f.fileno()).st_size == 0:
+                return file_path, 0, [], None, None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                encoding = _detect_encoding(mm[:ENCODING_SAMPLE_SIZE])
+                content = mm[:].decode(encoding, errors='ignore')
     except Exception as e:
-        print(f"[!] Could not read {file_path}: {e}")
-        return 0
+        return file_path, 0, [f"[!] Could not read {file_path}: {e}"], None, None
 
-    soup = BeautifulSoup(content, 'html.parser')
-    modified = False
     issues_found = 0
 
-    # Elements to check
-    tags = {
-        'a': 'href',
-        'link': 'href',
-        'script': 'src',
-        'img': 'src',
-        'source': 'src',
-        'iframe': 'src',
-        'meta': 'content' # Sometimes used for redirects or images
-    }
-
-    for tag_name, attr in tags.items():
-        for tag in soup.find_all(tag_name):
+    links = []
+    replacements = []
+    if file_path.lower().endswith(HTML_EXTENSIONS):
+        # Imported here so --help and JS/CSS-only scans don't pay for bs4
+        from bs4 import BeautifulSoup
+        # Fixes need each tag's source position, which only html.parser records
+        soup = BeautifulSoup(content, HTML_PARSER if dry_run else 'html.parser')
+
+        # One tree walk for every element type
+        for tag in soup.select(LINK_SELECTOR):
+            attr = TAG_ATTR[tag.name]
             url = tag.get(attr)
             if not url:
                 continue
-            
+
             # Special case for meta tags that aren't URLs
-            if tag_name == 'meta':
+            if tag.name == 'meta':
                 # Only check common URL attributes in meta
                 if tag.get('property') not in ['og:image', 'og:url', 'twitter:image']:
                     continue
 
-            target_path, is_root_relative = resolve_path(file_path, url)
-            
-            if not target_path:
-                continue
+            links.append((url, None, tag, attr))
+    else:
+        # No HTML tree to build for scripts and stylesheets. Keep each
+        # match's position so a fix rewrites that exact spot, and skip
+        # positions already found by the other pattern (url("/x.png") matches both).
+        # url(...) in a script is usually a string expression, not a URL.
+        seen = set()
+        patterns = (CSS_URL_RE, JS_PATH_RE) if file_path.lower().endswith('.css') else (JS_PATH_RE,)
+        for pattern in patterns:
+            for match in pattern.finditer(content):
+                raw = match.group(1)
+                url = raw.strip()
+                start = match.start(1) + len(raw) - len(raw.lstrip())
+                if not url or start in seen:
+                    continue
+                seen.add(start)
+                links.append((url, (start, start + len(url)), None, None))
 
-            # Check if file exists
-            if os.path.exists(target_path) and os.path.isfile(target_path):
-                continue
-            
-            # If directory, check for index.html
-            if os.path.isdir(target_path):
-                 if os.path.exists(os.path.join(target_path, 'index.html')):
-                     continue
-
-            # ISSUE FOUND
-            issues_found += 1
-            print(f"[-] Broken Link in {os.path.basename(file_path)}: {url}")
-            
-            # Attempt FIX: Case Insensitivity
-            target_dir = os.path.dirname(target_path)
-            target_file = os.path.basename(target_path)
-            
-            if os.path.exists(target_dir):
-                files_map = get_files_in_directory(target_dir)
-                if target_file.lower() in files_map:
-                    real_name = files_map[target_file.lower()]
-                    print(f"    [+] Fix Available: Case mismatch. Change '{target_file}' to '{real_name}'")
-                    
-                    if not dry_run:
-                        # Construct new URL
-                        new_url = url.replace(target_file, real_name)
-                        tag[attr] = new_url
-                        modified = True
-                        print(f"    [!] FIXED: Updated to {new_url}")
-                else:
-                    print(f"    [?] File not found in directory. No automatic fix.")
+    line_starts = None
+    for url, span, tag, attr in links:
+        target_path, is_root_relative = resolve_path(file_path, url)
+        
+        if not target_path:
+            continue
+        target_path = os.path.normpath(target_path)
+
+        # Check if file exists
+        if target_path in existing:
+            continue
+        
+        # If directory, check for index.html
+        if target_path in dirmap:
+             if os.path.join(target_path, 'index.html') in existing:
+                 continue
+
+        # The index misses symlinked directories and paths outside ROOT_DIR,
+        # so confirm on disk before reporting (rare, keeps the fast path stat-free)
+        if os.path.isfile(target_path):
+            continue
+        if os.path.isdir(target_path) and os.path.exists(os.path.join(target_path, 'index.html')):
+            continue
+
+        # ISSUE FOUND
+        issues_found += 1
+        messages.append(f"[-] Broken Link in {os.path.basename(file_path)}: {url}")
+        
+        # Attempt FIX: Case Insensitivity
+        target_dir = os.path.dirname(target_path)
+        target_file = os.path.basename(target_path)
+        
+        files_map = dirmap.get(target_dir)
+        if files_map is None and os.path.isdir(target_dir):
+            files_map = {f.lower(): f for f in os.listdir(target_dir)}
+        if files_map is not None:
+            if target_file.lower() in files_map:
+                real_name = files_map[target_file.lower()]
+                messages.append(f"    [+] Fix Available: Case mismatch. Change '{target_file}' to '{real_name}'")
+                
+                if not dry_run:
+                    if tag is not None:
+                        if line_starts is None:
+                            line_starts = [0] + [m.end() for m in re.finditer('\n', content)]
+                        span = _attr_value_span(content, line_starts, tag, attr, url)
+                    # Outcome message is filled in once we know the text changed
+                    replacements.append((url, span, target_file, real_name, len(messages)))
+                    messages.append(None)
             else:
-                print(f"    [?] Directory does not exist: {target_dir}")
+                messages.append(f"    [?] File not found in directory. No automatic fix.")
+        else:
+            messages.append(f"    [?] Directory does not exist: {target_dir}")
 
-    if modified and not dry_run:
-        try:
-            with open(file_path, 'w', encoding=encoding) as f:
-                f.write(str(soup))
-            print(f"[SUCCESS] Saved changes to {file_path}")
-        except Exception as e:
-            print(f"[!] Failed to write {file_path}: {e}")
+    # Patch the original text rather than re-serializing the tree,
+    # so formatting is preserved and diffs stay minimal
+    new_content = None
+    if replacements:
+        patched, applied = apply_replacements(content, replacements)
+        for url, span, target_file, real_name, index in replacements:
+            if span in applied:
+                messages[index] = f"    [!] FIXED: Updated to {url.replace(target_file, real_name)}"
+            else:
+                messages[index] = "    [?] Link not found verbatim in source. Left unchanged."
+        if patched != content:
+            new_content = patched
 
-    return issues_found
+    return file_path, issues_found, messages, new_content, encoding
+
+def _attr_value_span(content, line_starts, tag, attr, url):
+    """
+    Locates the raw value of attr inside the start tag bs4 reported for tag.
+    Returns None when the tag has no source position or the raw value doesn't
+    decode to url.
+    """
+    if tag.sourceline is None or tag.sourcepos is None:
+        return None
+    match = START_TAG_RE.match(content, line_starts[tag.sourceline - 1] + tag.sourcepos)
+    if not match:
+        return None
+    for attribute in TAG_ATTR_RE.finditer(content, match.start(1), match.end(1)):
+        if attribute.group(1).lower() != attr:
+            continue
+        for group in (2, 3, 4):
+            if attribute.group(group) is not None:
+                start, end = attribute.span(group)
+                return (start, end) if html.unescape(content[start:end]) == url else None
+        return None
+    return None
+
+def apply_replacements(content, replacements):
+    """
+    Applies case fixes to the raw text. Every fix carries the exact span of
+    the link it came from (an attribute value for HTML, a regex match for
+    JS/CSS), so nothing outside those spans is touched.
+    Returns:
+        (new_content, applied) where applied is the set of spans that changed
+    """
+    applied = set()
+
+    # Go last-to-first so earlier offsets stay valid
+    positional = sorted((r for r in replacements if r[1] is not None),
+                        key=lambda r: r[1][0], reverse=True)
+    for url, span, target_file, real_name, _ in positional:
+        start, end = span
+        new_value = content[start:end].replace(target_file, real_name)
+        if new_value != content[start:end]:
+            content = content[:start] + new_value + content[end:]
+            applied.add(span)
+
+    return content, applied
+
+def _init_worker(existing, dirmap, dry_run):
+    """Hands the file index to each worker process once, not per task."""
+    _WORKER_STATE.update(existing=existing, dirmap=dirmap, dry_run=dry_run)
+
+def _check_file_worker(file_path):
+    return check_and_fix_file(file_path, _WORKER_STATE['existing'],
+                              _WORKER_STATE['dirmap'], _WORKER_STATE['dry_run'])
+
+def report_results(results):
+    """Prints each file's findings and writes fixes from the parent process only."""
+    total_issues = 0
+    for file_path, issues_found, messages, new_content, encoding in results:
+        for message in messages:
+            print(message)
+        total_issues += issues_found
+
+        if new_content is not None:
+            try:
+                # content kept its original line endings, so write them back untranslated
+                with open(file_path, 'w', encoding=encoding, newline='') as f:
+                    f.write(new_content)
+                print(f"[SUCCESS] Saved changes to {file_path}")
+            except Exception as e:
+                print(f"[!] Failed to write {file_path}: {e}")
+    return total_issues
 
 def main():
     global DRY_RUN
-    if len(sys.argv) > 1 and sys.argv[1] == '--fix':
+    parser = argparse.ArgumentParser(description="Find and fix broken local links.")
+    parser.add_argument('--fix', action='store_true', help="Apply automatic repairs")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes for the scan (default: CPU count)")
+    args = parser.parse_args()
+
+    if args.fix:
         DRY_RUN = False
         print("MATCH MODE: FIXING ERRORS")
     else:
         print("MATCH MODE: DRY RUN (No changes will be made)")
         print("Run with '--fix' to apply changes.")
 
-    total_issues = 0
-    checked_files = 0
+    existing, dirmap, file_list = build_index(ROOT_DIR)
 
-    for root, dirs, files in os.walk(ROOT_DIR):
-        # Skip hidden folders and backups
-        if '.git' in root or 'deploy_backups' in root:
-            continue
-            
-        for file in files:
-            if any(file.endswith(ext) for ext in EXTENSIONS_TO_CHECK):
-                file_path = os.path.join(root, file)
-                # Skip the mirror script itself and report logs
-                if file in ['fix_404s.py', 'mirror_log.txt']:
-                    continue
-                    
-                total_issues += check_and_fix_file(file_path, DRY_RUN)
-                checked_files += 1
+    if args.jobs > 1 and len(file_list) > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker,
+                                 initargs=(existing, dirmap, DRY_RUN)) as executor:
+            total_issues = report_results(
+                executor.map(_check_file_worker, file_list, chunksize=32))
+    else:
+        total_issues = report_results(
+            check_and_fix_file(file_path, existing, dirmap, DRY_RUN) for file_path in file_list)
+    checked_files = len(file_list)
 
     print("\n" + "="*40)
     print(f"Scan Complete.")
@@ -1,16 +1,21 @@
 import unittest
+import argparse
+import copy
 import json
 import os
+import tempfile
 import requests
 import threading
 import time
-from deploy import start_server, load_config
+from unittest import mock
+import deploy
+from deploy import start_server, load_config, _reflink_copy, _positive_int
 
 class TestDeployment(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
-        # Load config
-        cls.config = load_config()
+        # Load config (copied, since the cached dict is shared)
+        cls.config = copy.deepcopy(load_config())
         # Use a different port for testing to avoid conflicts
         cls.config['server']['port'] = 8081
         cls.config['server']['root_dir'] = './www'
@@ -52,5 +57,102 @@ class TestDeployment(unittest.TestCase):
         response = requests.get(url)
         self.assertEqual(response.status_code, 200)
 
+    def test_config_cache_hit(self):
+        """Test that repeat loads of an unchanged file return the cached object."""
+        first = load_config()
+        self.assertIs(load_config(), first)
+
+    def test_config_cache_invalidated_on_change(self):
+        """Test that rewriting the config file (new size or mtime) is picked up."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'config.json')
+            with open(path, 'w') as f:
+                json.dump({'server': {'port': 1}}, f)
+            self.assertEqual(load_config(path)['server']['port'], 1)
+
+            # Different size
+            with open(path, 'w') as f:
+                json.dump({'server': {'port': 12345}}, f)
+            self.assertEqual(load_config(path)['server']['port'], 12345)
+
+            # Same size, only the mtime moves
+            with open(path, 'w') as f:
+                json.dump({'server': {'port': 54321}}, f)
+            st = os.stat(path)
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+            self.assertEqual(load_config(path)['server']['port'], 54321)
+
+    def test_reflink_copy_preserves_content(self):
+        """Test that the copy function falls back cleanly and keeps file data."""
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, 'src.html')
+            with open(src, 'w') as f:
+                f.write('<html></html>')
+            dst = _reflink_copy(src, os.path.join(tmp, 'dst.html'))
+            with open(dst) as f:
+                self.assertEqual(f.read(), '<html></html>')
+
+    def test_workers_must_be_positive(self):
+        """Test that worker counts below 1 are rejected at argument parsing."""
+        self.assertEqual(_positive_int('4'), 4)
+        for bad in ('0', '-2', 'x'):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                _positive_int(bad)
+
+class TestRsyncSync(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        self.config = {'server': {'root_dir': './www'}}
+        os.makedirs('www')
+        with open(os.path.join('www', 'index.html'), 'w') as f:
+            f.write('<html></html>')
+        # Pretend rsync is installed; the subprocess call itself is mocked per test
+        patcher = mock.patch.object(deploy.shutil, 'which', return_value='/usr/bin/rsync')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        os.chdir(self.old_cwd)
+        self.tmp.cleanup()
+
+    def test_backup_links_against_newest_backup(self):
+        """Test that backups pass --link-dest for the newest backup_* and slash-terminated paths."""
+        for name in ('backup_20240101_000000', 'backup_20250101_000000'):
+            os.makedirs(os.path.join(deploy.BACKUP_DIR, name))
+        with mock.patch.object(deploy.subprocess, 'run') as run:
+            backup_path = deploy.backup_current_version(self.config)
+        newest = os.path.abspath(os.path.join(deploy.BACKUP_DIR, 'backup_20250101_000000'))
+        run.assert_called_once_with(
+            ['rsync', '-a', '--delete', f'--link-dest={newest}', './www/', backup_path + '/'],
+            check=True)
+
+    def test_first_backup_has_no_link_dest(self):
+        """Test that the first backup is a plain copy."""
+        os.makedirs(deploy.BACKUP_DIR)
+        with mock.patch.object(deploy.subprocess, 'run') as run:
+            backup_path = deploy.backup_current_version(self.config)
+        run.assert_called_once_with(['rsync', '-a', '--delete', './www/', backup_path + '/'], check=True)
+
+    def test_deploy_excludes(self):
+        """Test the deploy argv and the anchored patterns written to the exclude file."""
+        calls = []
+
+        def fake_run(argv, check):
+            exclude_file = next(a for a in argv if a.startswith('--exclude-from='))
+            with open(exclude_file.split('=', 1)[1]) as f:
+                calls.append((argv, f.read().splitlines()))
+
+        with mock.patch.object(deploy.subprocess, 'run', side_effect=fake_run):
+            deploy.deploy_files(self.config)
+
+        argv, patterns = calls[0]
+        self.assertEqual(argv[:3], ['rsync', '-a', '--delete'])
+        self.assertEqual(argv[-2:], ['./', './www/'])
+        for pattern in ('/.*', '/www', '/deploy_backups', '/deploy.py'):
+            self.assertIn(pattern, patterns)
+        self.assertNotIn('/./www', patterns)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+import os
+import tempfile
+import fix_404s
+from fix_404s import build_index, check_and_fix_file
+
+class TestFix404s(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.old_root = fix_404s.ROOT_DIR
+        fix_404s.ROOT_DIR = self.root
+
+    def tearDown(self):
+        fix_404s.ROOT_DIR = self.old_root
+        self.tmp.cleanup()
+
+    def write(self, rel_path, text=''):
+        path = os.path.join(self.root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', newline='') as f:
+            f.write(text)
+        return path
+
+    def check(self, path, dry_run=False):
+        existing, dirmap, _ = build_index(self.root)
+        return check_and_fix_file(path, existing, dirmap, dry_run)
+
+    def test_fix_targets_broken_attribute_only(self):
+        """Test that a valid link sharing the broken URL as a substring is left alone."""
+        self.write('other/page.html')
+        self.write('docs/Page.html')
+        page = self.write('docs/index.html',
+                          '<a href="../other/page.html">ok</a>\n<a href="page.html">broken</a>\n')
+        _, issues, messages, new_content, _ = self.check(page)
+        self.assertEqual(issues, 1)
+        self.assertEqual(new_content,
+                         '<a href="../other/page.html">ok</a>\n<a href="Page.html">broken</a>\n')
+        self.assertIn("    [!] FIXED: Updated to Page.html", messages)
+
+    def test_fix_matches_entity_encoded_attribute(self):
+        """Test that fixes apply to attribute values containing HTML entities."""
+        self.write('sub/Page.html')
+        page = self.write('index.html', '<a href="sub/page.html?a=1&amp;b=2">x</a>')
+        _, issues, messages, new_content, _ = self.check(page)
+        self.assertEqual(issues, 1)
+        self.assertEqual(new_content, '<a href="sub/Page.html?a=1&amp;b=2">x</a>')
+
+    def test_fix_only_touches_reported_tag(self):
+        """Test that comments, script bodies and other attributes keep the same URL text."""
+        self.write('img/Logo.png')
+        source = ('<html><body>\n'
+                  '<!-- <a href="img/logo.png">old</a> -->\n'
+                  '<p title=\'say href="img/logo.png"\'>hi</p>\n'
+                  '<script>var img = new Image(); img.src = "img/logo.png";</script>\n'
+                  '  <img alt="a > b"\n       src="img/logo.png">\n'
+                  '</body></html>\n')
+        page = self.write('index.html', source)
+        _, issues, messages, new_content, _ = self.check(page)
+        self.assertEqual(issues, 1)
+        self.assertEqual(new_content, source.replace('src="img/logo.png">', 'src="img/Logo.png">'))
+        self.assertEqual(sum(1 for m in messages if m.startswith("    [!] FIXED")), 1)
+
+    def test_unlocatable_fix_is_not_reported_as_fixed(self):
+        """Test that nothing is written or reported FIXED when the text did not change."""
+        self.write('My Page.html')
+        page = self.write('index.html', '<a href="my%20page.html">x</a>')
+        _, issues, messages, new_content, _ = self.check(page)
+        self.assertEqual(issues, 1)
+        self.assertIsNone(new_content)
+        self.assertFalse(any(m.startswith("    [!] FIXED") for m in messages))
+
+    def test_css_url_reported_once(self):
+        """Test that a URL matched by both CSS and JS patterns counts as one link."""
+        self.write('img/Logo.png')
+        sheet = self.write('style.css', 'a{b:url("/img/logo.png")} /* /img/logo.png */')
+        _, issues, _, new_content, _ = self.check(sheet)
+        self.assertEqual(issues, 1)
+        self.assertEqual(new_content, 'a{b:url("/img/Logo.png")} /* /img/logo.png */')
+
+    def test_index_skips_backups(self):
+        """Test that the index does not walk deploy_backups."""
+        self.write('deploy_backups/backup_1/index.html')
+        existing, dirmap, file_list = build_index(self.root)
+        backups = os.path.join(self.root, 'deploy_backups')
+        self.assertNotIn(backups, dirmap)
+        self.assertFalse(any(p.startswith(backups) for p in existing))
+        self.assertFalse(any(p.startswith(backups) for p in file_list))
+
+    def test_symlinked_directory_link_is_not_broken(self):
+        """Test that links through a symlinked directory fall back to a disk check."""
+        with tempfile.TemporaryDirectory() as shared:
+            with open(os.path.join(shared, 'a.css'), 'w') as f:
+                f.write('')
+            os.symlink(shared, os.path.join(self.root, 'lib'))
+            page = self.write('index.html', '<link rel="stylesheet" href="lib/a.css">')
+            _, issues, _, _, _ = self.check(page)
+            self.assertEqual(issues, 0)
+
+    def test_js_url_expressions_are_not_links(self):
+        """Test that url(...) built from JS expressions isn't treated as a link."""
+        self.write('img/Logo.png')
+        script = self.write('app.js',
+                            "el.style.background = 'url(' + imgPath + ')';\n"
+                            "el.style.mask = `url(someVar)`;\n"
+                            "var logo = '/img/logo.png';\n")
+        _, issues, messages, new_content, _ = self.check(script)
+        self.assertEqual(issues, 1)
+        self.assertEqual(messages[0], "[-] Broken Link in app.js: /img/logo.png")
+        self.assertIn("var logo = '/img/Logo.png';", new_content)
+
+    def test_dry_run_writes_nothing(self):
+        """Test that dry run reports the issue without producing new content."""
+        self.write('docs/Page.html')
+        page = self.write('docs/index.html', '<a href="page.html">broken</a>')
+        _, issues, _, new_content, _ = self.check(page, dry_run=True)
+        self.assertEqual(issues, 1)
+        self.assertIsNone(new_content)
+
+if __name__ == '__main__':
+    unittest.main()